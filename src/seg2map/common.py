@@ -9,18 +9,21 @@ import json
 import math
 from datetime import datetime
 import logging
-from typing import Set, Union, List
+from typing import Set, Union, List, Tuple
 import json
 import math
 import logging
 import os, json, shutil
 from glob import glob
 import concurrent.futures
+from collections import deque
+from functools import lru_cache
 from datetime import datetime
 from time import perf_counter
 
 # Internal dependencies imports
 from seg2map import map_functions
+from seg2map import exceptions
 
 from tqdm.auto import tqdm
 import requests
@@ -43,9 +46,22 @@ from ipywidgets import Layout
 from ipywidgets import HTML
 from ipyfilechooser import FileChooser
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyogrio
+except ImportError:
+    pyogrio = None
+
 
 logger = logging.getLogger(__name__)
 
+# default pattern used by find_config_json to locate config.json
+CONFIG_JSON_REGEX = re.compile(r"^config\.json$", re.IGNORECASE)
+
 
 def time_func(func):
     def wrapper(*args, **kwargs):
@@ -764,12 +780,61 @@ def remove_zip_files(paths):
         concurrent.futures.wait(futures)
 
 
-def get_subdirs(parent_dir: str):
+def _scan_subdirs(path: str) -> Tuple[List[str], List[str]]:
+    """Returns the subdirectories of path and the subset of them to walk into.
+    Like os.walk, symlinks to directories are listed but not walked into and
+    directories that cannot be read are skipped instead of raising an error."""
+    subdirs = []
+    walk_dirs = []
+    try:
+        # DirEntry.is_dir() uses the type info cached by scandir, avoiding a stat per entry
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if not entry.is_dir():
+                        continue
+                    is_symlink = entry.is_symlink()
+                except OSError:
+                    continue
+                subdirs.append(entry.path)
+                if not is_symlink:
+                    walk_dirs.append(entry.path)
+    except OSError as error:
+        logger.warning(f"Could not scan directory {path}: {error}")
+    return subdirs, walk_dirs
+
+
+def _is_empty(path: str) -> bool:
+    # stops after the first entry instead of listing the whole directory
+    with os.scandir(path) as entries:
+        return next(entries, None) is None
+
+
+def get_subdirs(parent_dir: str, max_workers: int = 8) -> List[str]:
     # Get a list of all the subdirectories in the parent directory
+    # directories are scanned breadth first. Once enough directories are queued they are
+    # scanned by a pool of threads because scandir releases the GIL, which overlaps the
+    # round trips on network filesystems. Small trees are scanned without starting a pool.
     subdirectories = []
-    for root, dirs, files in os.walk(parent_dir):
-        for d in dirs:
-            subdirectories.append(os.path.join(root, d))
+    queue = deque([parent_dir])
+    executor = None
+    try:
+        while queue:
+            paths = [queue.popleft() for _ in range(min(len(queue), 64))]
+            if len(paths) < max_workers:
+                results = map(_scan_subdirs, paths)
+            else:
+                if executor is None:
+                    executor = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=max_workers
+                    )
+                results = executor.map(_scan_subdirs, paths)
+            for subdirs, walk_dirs in results:
+                subdirectories.extend(subdirs)
+                queue.extend(walk_dirs)
+    finally:
+        if executor is not None:
+            executor.shutdown()
     return subdirectories
 
 
@@ -966,7 +1031,7 @@ def delete_empty_dirs(dir_path: str):
     None
     """
     subdirs = get_subdirs(dir_path)
-    remove_dirs = [subdir for subdir in subdirs if len(os.listdir(subdir)) == 0]
+    remove_dirs = [subdir for subdir in subdirs if _is_empty(subdir)]
     for remove_dir in remove_dirs:
         os.removedirs(remove_dir)
 
@@ -982,10 +1047,24 @@ def create_year_directories(start_year: int, end_year: int, base_path: str) -> N
     Returns:
         None
     """
-    for year in range(start_year, end_year + 1):
-        year_path = os.path.join(base_path, str(year))
-        if not os.path.exists(year_path):
-            os.makedirs(year_path)
+    year_paths = [
+        os.path.join(base_path, str(year)) for year in range(start_year, end_year + 1)
+    ]
+    if len(year_paths) <= 10:
+        for year_path in year_paths:
+            os.makedirs(year_path, exist_ok=True)
+        return
+    # makedirs releases the GIL so threads overlap the round trips on network filesystems
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=min(16, len(year_paths))
+    ) as executor:
+        futures = [
+            executor.submit(os.makedirs, year_path, exist_ok=True)
+            for year_path in year_paths
+        ]
+        # raise any error encountered while creating a directory
+        for future in concurrent.futures.as_completed(futures):
+            future.result()
 
 
 def create_subdirectory(name: str, parent_dir: str = None) -> str:
@@ -1059,6 +1138,17 @@ def clear_row(row: HBox):
     row.children = []
 
 
+def _json_default(obj):
+    """Converts numpy and shapely objects that json cannot serialize into python types"""
+    if hasattr(obj, "__geo_interface__"):
+        return obj.__geo_interface__
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
 def save_to_geojson_file(out_file: str, geojson: dict, **kwargs) -> None:
     """save_to_geojson_file Saves given geojson to a geojson file at outfile
     Args:
@@ -1071,27 +1161,51 @@ def save_to_geojson_file(out_file: str, geojson: dict, **kwargs) -> None:
     if ext == ".geojson":
         out_geojson = out_file
     else:
-        out_geojson = os.path.splitext(out_file)[1] + ".geojson"
-    with open(out_geojson, "w") as f:
-        json.dump(geojson, f, **kwargs)
+        out_geojson = os.path.splitext(out_file)[0] + ".geojson"
+    if orjson is not None and not kwargs:
+        with open(out_geojson, "wb") as f:
+            f.write(
+                orjson.dumps(
+                    geojson,
+                    default=_json_default,
+                    option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+                )
+            )
+    else:
+        kwargs.setdefault("default", _json_default)
+        with open(out_geojson, "w") as f:
+            json.dump(geojson, f, **kwargs)
 
 
-def download_url(url: str, save_path: str, filename: str = None, chunk_size: int = 128):
+def download_url(
+    url: str,
+    save_path: str,
+    filename: str = None,
+    chunk_size: int = 1024 * 64,
+    session: requests.Session = None,
+):
     """Downloads the data from the given url to the save_path location.
     Args:
         url (str): url to data to download
         save_path (str): directory to save data
-        chunk_size (int, optional):  Defaults to 128.
+        chunk_size (int, optional):  Defaults to 64 KiB.
+        session (requests.Session, optional): session to reuse connections across downloads. Defaults to None.
     """
-    with requests.get(url, stream=True) as r:
+    requester = session if session is not None else requests
+    with requester.get(url, stream=True) as r:
         if r.status_code == 404:
             logger.error(f"DownloadError: {save_path}")
             raise exceptions.DownloadError(os.path.basename(save_path))
         # check header to get content length, in bytes
-        total_length = int(r.headers.get("Content-Length"))
+        content_length = r.headers.get("Content-Length")
         with open(save_path, "wb") as fd:
+            if content_length is None:
+                # no progress bar can be shown so copy the raw stream in large blocks
+                r.raw.decode_content = True
+                shutil.copyfileobj(r.raw, fd, length=1 << 20)
+                return
             with tqdm(
-                total=total_length,
+                total=int(content_length),
                 unit="B",
                 unit_scale=True,
                 unit_divisor=1024,
@@ -1105,11 +1219,8 @@ def download_url(url: str, save_path: str, filename: str = None, chunk_size: int
 
 
 def is_list_empty(main_list: list) -> bool:
-    all_empty = True
-    for np_array in main_list:
-        if len(np_array) != 0:
-            all_empty = False
-    return all_empty
+    # size counts every element so arrays with shape (N, 0) are also empty
+    return not any(np.size(np_array) for np_array in main_list)
 
 
 def get_center_rectangle(coords: list) -> tuple:
@@ -1142,6 +1253,38 @@ def get_epsg_from_geometry(geometry: "shapely.geometry.polygon.Polygon") -> int:
     return int(utm_code)
 
 
+def get_epsg_from_gdf(gdf: gpd.GeoDataFrame) -> np.ndarray:
+    """Returns the most accurate utm epsg code for each geometry in a geodataframe in crs 4326.
+    The utm zones are computed for all the geometries at once instead of one geometry at a time.
+
+    Args:
+        gdf (gpd.GeoDataFrame): geodataframe of geometries in crs 4326
+
+    Returns:
+        np.ndarray: integer epsg code for each geometry in gdf
+    """
+    points = gdf.geometry.representative_point()
+    lon = points.x.to_numpy()
+    lat = points.y.to_numpy()
+    utm_band = (np.floor((lon + 180) / 6).astype(int) % 60) + 1
+    return np.where(lat >= 0, 32600, 32700) + utm_band
+
+
+def estimate_utm_for_gdf(gdf: gpd.GeoDataFrame) -> int:
+    """Returns a single utm epsg code for all the geometries in a geodataframe in crs 4326
+    based on the mean of the geometries' representative points
+
+    Args:
+        gdf (gpd.GeoDataFrame): geodataframe of geometries in crs 4326
+
+    Returns:
+        int: epsg code of the utm zone that best fits all the geometries in gdf
+    """
+    points = gdf.geometry.representative_point()
+    utm_code = convert_wgs_to_utm(points.x.mean(), points.y.mean())
+    return int(utm_code)
+
+
 def convert_wgs_to_utm(lon: float, lat: float) -> str:
     """return most accurate utm epsg-code based on lat and lng
     convert_wgs_to_utm function, see https://stackoverflow.com/a/40140326/4556479
@@ -1152,7 +1295,7 @@ def convert_wgs_to_utm(lon: float, lat: float) -> str:
         str: new espg code
     """
     utm_band = str((math.floor((lon + 180) / 6) % 60) + 1)
-    if len(utm_band) == "1":
+    if len(utm_band) == 1:
         utm_band = "0" + utm_band
     if lat >= 0:
         epsg_code = "326" + utm_band  # North
@@ -1161,10 +1304,12 @@ def convert_wgs_to_utm(lon: float, lat: float) -> str:
     return epsg_code
 
 
-def get_colors(length: int) -> list:
-    # returns a list of color hex codes as long as length
-    cmap = matplotlib.pyplot.get_cmap("plasma", length)
-    cmap_list = [matplotlib.colors.rgb2hex(i) for i in cmap.colors]
+@lru_cache(maxsize=64)
+def get_colors(length: int) -> tuple:
+    # returns a tuple of color hex codes as long as length
+    cmap = matplotlib.colormaps["plasma"].resampled(length)
+    rgb = np.round(cmap(np.arange(length))[:, :3] * 255).astype(np.uint8)
+    cmap_list = tuple(f"#{r:02x}{g:02x}{b:02x}" for r, g, b in rgb.tolist())
     return cmap_list
 
 
@@ -1175,8 +1320,17 @@ def get_area(polygon: dict) -> float:
 
 
 def read_json_file(filename: str) -> dict:
-    with open(filename, "r", encoding="utf-8") as input_file:
-        data = json.load(input_file)
+    if orjson is not None:
+        with open(filename, "rb") as input_file:
+            raw = input_file.read()
+        try:
+            data = orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            # files written by json.dump can contain NaN or Infinity which orjson rejects
+            data = json.loads(raw)
+    else:
+        with open(filename, "r", encoding="utf-8") as input_file:
+            data = json.load(input_file)
     return data
 
 
@@ -1211,26 +1365,30 @@ def find_config_json(search_path: str, search_pattern: str = None) -> str:
     """
     logger.info(f"searching directory for config.json: {search_path}")
     if search_pattern == None:
-        search_pattern = r"^config\.json$"
-    config_regex = re.compile(search_pattern, re.IGNORECASE)
-    logger.info(f"search_pattern: {search_pattern}")
+        config_regex = CONFIG_JSON_REGEX
+    else:
+        config_regex = re.compile(search_pattern, re.IGNORECASE)
+    logger.info(f"search_pattern: {config_regex.pattern}")
 
-    for file in os.listdir(search_path):
-        if config_regex.match(file):
-            logger.info(f"{file} matched regex")
-            file_path = os.path.join(search_path, file)
-            return file_path
+    with os.scandir(search_path) as entries:
+        for entry in entries:
+            if entry.is_file() and config_regex.match(entry.name):
+                logger.info(f"{entry.name} matched regex")
+                return entry.path
 
     raise FileNotFoundError(f"config.json file was not found at {search_path}")
 
 
-def config_to_file(config: Union[dict, gpd.GeoDataFrame], file_path: str):
+def config_to_file(
+    config: Union[dict, gpd.GeoDataFrame], file_path: str, save_parquet: bool = False
+):
     """Saves config to config.json or config_gdf.geojson
     config's type is dict or geodataframe respectively
 
     Args:
         config (Union[dict, gpd.GeoDataFrame]): data to save to config file
         file_path (str): full path to directory to save config file
+        save_parquet (bool, optional): also save a geodataframe config to config_gdf.parquet. Defaults to False.
     """
     if isinstance(config, dict):
         filename = f"config.json"
@@ -1241,7 +1399,15 @@ def config_to_file(config: Union[dict, gpd.GeoDataFrame], file_path: str):
         filename = f"config_gdf.geojson"
         save_path = os.path.abspath(os.path.join(file_path, filename))
         logger.info(f"Saving config gdf:{config} \nSaved to {save_path}")
-        config.to_file(save_path, driver="GeoJSON")
+        if pyogrio is not None:
+            config.to_file(save_path, driver="GeoJSON", engine="pyogrio")
+        else:
+            config.to_file(save_path, driver="GeoJSON")
+        if save_parquet:
+            # GeoParquet stores the geometries as columnar WKB which is much faster to reload
+            parquet_path = os.path.abspath(os.path.join(file_path, "config_gdf.parquet"))
+            config.to_parquet(parquet_path)
+            logger.info(f"Saved config gdf to {parquet_path}")
 
 
 def create_json_config(input_settings: dict, settings: dict) -> dict:
@@ -1302,14 +1468,33 @@ def create_config_gdf(
 
 def write_to_json(filepath: str, settings: dict):
     """ "Write the  settings dictionary to json file"""
-    with open(filepath, "w", encoding="utf-8") as output_file:
-        json.dump(settings, output_file)
+    if orjson is not None:
+        # orjson writes NaN and Infinity as null, the readers accept both forms
+        with open(filepath, "wb") as output_file:
+            output_file.write(
+                orjson.dumps(
+                    settings,
+                    option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+                )
+            )
+    else:
+        with open(filepath, "w", encoding="utf-8") as output_file:
+            json.dump(settings, output_file)
 
 
 def read_geojson_file(geojson_file: str) -> dict:
     """Returns the geojson of the selected ROIs from the file specified by geojson_file"""
-    with open(geojson_file) as f:
-        data = geojson.load(f)
+    if orjson is not None:
+        with open(geojson_file, "rb") as f:
+            raw = f.read()
+        try:
+            data = orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            # files written by json.dump can contain NaN or Infinity which orjson rejects
+            data = geojson.loads(raw.decode("utf-8"))
+    else:
+        with open(geojson_file) as f:
+            data = geojson.load(f)
     return data
 
 
@@ -1317,13 +1502,13 @@ def read_gpd_file(filename: str) -> gpd.GeoDataFrame:
     """
     Returns geodataframe from geopandas geodataframe file
     """
-    if os.path.exists(filename):
-        logger.info(f"Opening \n {filename}")
-        with open(filename, "r") as f:
-            gpd_data = gpd.read_file(f)
-    else:
-        raise FileNotFoundError
-    return gpd_data
+    if not os.path.exists(filename):
+        raise FileNotFoundError(filename)
+    logger.info(f"Opening \n {filename}")
+    # passing the path lets pyogrio read the file directly instead of through a python file object
+    if pyogrio is not None:
+        return gpd.read_file(filename, engine="pyogrio")
+    return gpd.read_file(filename)
 
 
 def create_roi_settings(
@@ -1356,19 +1541,18 @@ def create_roi_settings(
         dict: settings for each roi with roi id as the key
     """
 
-    roi_settings = {}
     sitename = settings["sitename"]
     dates = settings["dates"]
-    for roi_id in list(selected_ids):
-        roi_name = f"ID_{roi_id}_dates_{dates[0]}_to_{dates[1]}"
-        roi_info = {
+    roi_settings = {
+        roi_id: {
             "dates": dates,
             "roi_id": roi_id,
-            "roi_name": roi_name,
+            "roi_name": f"ID_{roi_id}_dates_{dates[0]}_to_{dates[1]}",
             "sitename": sitename,
             "filepath": filepath,
         }
-        roi_settings[roi_id] = roi_info
+        for roi_id in selected_ids
+    }
     return roi_settings
 
 
@@ -1565,7 +1749,54 @@ def get_RGB_in_path(current_path: str) -> str:
         return RGB_path
 
 
-def scale(matrix: np.ndarray, rows: int, cols: int) -> np.ndarray:
+@lru_cache(maxsize=None)
+def _get_numba_kernels():
+    """Imports numba and compiles the numba kernels the first time they are needed.
+    numba is only imported here so importing this module does not pay its import cost.
+
+    Returns:
+        tuple: (scale kernel, rescale kernel) or None if numba is not installed
+    """
+    try:
+        import numba
+    except ImportError:
+        return None
+
+    @numba.njit(parallel=True, cache=True)
+    def _scale_nb(matrix, rows, cols):
+        # nearest neighbor gather with the output rows split across threads
+        src_rows, src_cols = matrix.shape
+        out = np.empty((rows, cols), dtype=matrix.dtype)
+        for r in numba.prange(rows):
+            src_r = r * src_rows // rows
+            for c in range(cols):
+                out[r, c] = matrix[src_r, c * src_cols // cols]
+        return out
+
+    @numba.njit(parallel=True, cache=True, fastmath=True)
+    def _rescale_nb(flat, m, scale_factor, mn, out):
+        # affine rescale of flat into out, both 1d views of the same shape
+        for i in numba.prange(flat.size):
+            out[i] = (flat[i] - m) * scale_factor + mn
+
+    return _scale_nb, _rescale_nb
+
+
+def _use_numba(engine: str):
+    """Returns the numba kernels if they should be used for the given engine, otherwise None"""
+    if engine not in ("numpy", "numba"):
+        raise ValueError(f"engine must be 'numpy' or 'numba' not '{engine}'")
+    if engine == "numpy":
+        return None
+    kernels = _get_numba_kernels()
+    if kernels is None:
+        logger.warning("numba is not installed. Using numpy instead.")
+    return kernels
+
+
+def scale(
+    matrix: np.ndarray, rows: int, cols: int, engine: str = "numpy"
+) -> np.ndarray:
     """returns resized matrix with shape(rows,cols)
         for 2d discrete labels
         for resizing 2d integer arrays
@@ -1573,28 +1804,51 @@ def scale(matrix: np.ndarray, rows: int, cols: int) -> np.ndarray:
         im (np.ndarray): 2d matrix to resize
         nR (int): number of rows to resize 2d matrix to
         nC (int): number of columns to resize 2d matrix to
+        engine (str, optional): "numpy" or "numba". Defaults to "numpy".
 
     Returns:
         np.ndarray: resized matrix with shape(rows,cols)
     """
-    src_rows = len(matrix)  # source number of rows
-    src_cols = len(matrix[0])  # source number of columns
-    tmp = [
-        [
-            matrix[int(src_rows * r / rows)][int(src_cols * c / cols)]
-            for c in range(cols)
-        ]
-        for r in range(rows)
-    ]
-    return np.array(tmp).reshape((rows, cols))
+    kernels = _use_numba(engine)
+    matrix = np.ascontiguousarray(matrix)
+    src_rows, src_cols = matrix.shape[:2]
+    if (rows, cols) == (src_rows, src_cols):
+        # always return a new array so callers can modify the result without changing matrix
+        return matrix.copy()
+    if kernels is not None and matrix.ndim == 2:
+        scale_nb, _ = kernels
+        return scale_nb(matrix, rows, cols)
+    # upsampling by whole number factors repeats each label without any indexing
+    if rows % src_rows == 0 and cols % src_cols == 0:
+        return np.repeat(
+            np.repeat(matrix, rows // src_rows, axis=0), cols // src_cols, axis=1
+        )
+    # nearest neighbor index of the source row/column for each output row/column
+    r_idx = (np.arange(rows) * src_rows // rows).astype(np.intp)
+    c_idx = (np.arange(cols) * src_cols // cols).astype(np.intp)
+    return matrix[r_idx[:, None], c_idx]
 
 
-def rescale_array(dat, mn, mx):
+def rescale_array(dat, mn, mx, engine: str = "numpy"):
     """
     rescales an input dat between mn and mx
     Code from doodleverse_utils by Daniel Buscombe
     source: https://github.com/Doodleverse/doodleverse_utils
-    """
-    m = min(dat.flatten())
-    M = max(dat.flatten())
-    return (mx - mn) * (dat - m) / (M - m) + mn
+    engine (str, optional): "numpy" or "numba". Defaults to "numpy".
+    """
+    kernels = _use_numba(engine)
+    dat = np.asarray(dat)
+    m = dat.min()
+    M = dat.max()
+    # keep float32 inputs in float32 to avoid doubling memory with a float64 upcast
+    dtype = np.float32 if dat.dtype == np.float32 else np.float64
+    scale_factor = dtype((mx - mn) / (M - m))
+    if kernels is not None:
+        _, rescale_nb = kernels
+        out = np.empty(dat.shape, dtype=dtype)
+        rescale_nb(dat.ravel(), dtype(m), scale_factor, dtype(mn), out.reshape(-1))
+        return out
+    out = np.subtract(dat, m, dtype=dtype)
+    out *= scale_factor
+    out += dtype(mn)
+    return out
@@ -5,7 +5,7 @@ from typing import List, Tuple
 import platform
 import logging
 import os, json, shutil
-from glob import glob
+from glob import glob, iglob
 import concurrent.futures
 
 from seg2map import exceptions
@@ -476,11 +476,8 @@ def copy_multiband_tifs(roi_path: str, multiband_path: str):
         roi_path + os.sep + "tile*",
         recursive=True,
     ):
-        files = glob(folder + os.sep + "*multiband.tif")
-        [
+        for file in iglob(folder + os.sep + "*multiband.tif"):
             shutil.copyfile(file, multiband_path + os.sep + file.split(os.sep)[-1])
-            for file in files
-        ]
 
 
 def mk_filepaths(tiles_info: List[dict]):
@@ -17,6 +17,7 @@ from seg2map import map_functions
 from seg2map import sessions
 
 import geopandas as gpd
+import pandas as pd
 import tqdm
 import tqdm.auto
 from ipyleaflet import DrawControl, LayersControl, WidgetControl, GeoJSON
@@ -704,7 +705,11 @@ class Seg2Map:
         Returns:
             gpd.GeoDataFrame:  geodataframe of all rois selected by the roi_ids
         """
-        selected_rois_gdf = self.rois.gdf[self.rois.gdf["id"].isin(roi_ids)]
+        ids = pd.Index([str(roi_id) for roi_id in roi_ids])
+        missing_ids = ids.difference(self.rois.gdf.index)
+        if not missing_ids.empty:
+            logger.warning(f"ROI ids are not on the map: {missing_ids.to_list()}")
+        selected_rois_gdf = self.rois.gdf[self.rois.gdf.index.isin(ids)]
         return selected_rois_gdf
 
     def remove_all(self) -> None:
@@ -4,7 +4,7 @@ from typing import Union
 from functools import lru_cache
 
 # Internal dependencies imports
-from .exceptions import TooLargeError, TooSmallError
+from .exceptions import TooLargeError, TooSmallError, Id_Not_Found
 from seg2map import common
 
 # External dependencies imports
@@ -62,7 +62,7 @@ class ROI:
         gdf = gpd.GeoDataFrame({"geometry": geom})
         gdf.crs = crs
         gdf["id"] = new_id
-        gdf.index = gdf["id"]
+        gdf.index = gdf["id"].astype(str)
         gdf.index = gdf.index.rename("ROI_ID")
         logger.info(f"new geodataframe created: {gdf}")
         return gdf
@@ -129,7 +129,8 @@ class ROI:
             new_gdf.drop(index=drop_ids, axis=0, inplace=True)
         # convert crs of ROIs to the map crs
         new_gdf.to_crs(crs)
-        new_gdf.index = new_gdf["id"]
+        # ROI ids are looked up as strings so ids loaded as numbers are indexed as strings
+        new_gdf.index = new_gdf["id"].astype(str)
         new_gdf.index = new_gdf.index.rename("ROI_ID")
         # add new_gdf to self.gdf
         self.gdf = self.add_new(new_gdf)
@@ -153,6 +154,20 @@ class ROI:
     def get_geodataframe(self) -> gpd.GeoDataFrame:
         return self.gdf
 
+    def extract_roi_by_id(self, roi_id: str) -> gpd.GeoDataFrame:
+        """Returns a geodataframe containing the ROI whose id matches roi_id.
+        Uses the ROI_ID index of self.gdf for a hashed lookup instead of comparing every id.
+        Args:
+            roi_id (str): id of the ROI to extract
+        Raises:
+            Id_Not_Found: raised if no ROI has the id roi_id
+        Returns:
+            gpd.GeoDataFrame: geodataframe with the ROI whose id matches roi_id"""
+        roi_id = str(roi_id)
+        if roi_id not in self.gdf.index:
+            raise Id_Not_Found(roi_id)
+        return self.gdf.loc[[roi_id]]
+
     # def add_new(
     #     self, new_gdf: gpd.GeoDataFrame,
     # ) -> gpd.GeoDataFrame: